@@ -3,13 +3,578 @@
 Codebase Consolidator - CLI tool to combine multiple code files into organized markdown files
 """
 
-import argparse
+import bisect
+import codecs
 import fnmatch
+import functools
+import heapq
+import io
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Set
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Pattern, Set, Tuple
 import sys
 from datetime import datetime
 
+# fnmatch.fnmatch normalizes case on Windows; keep that behaviour for precompiled globs
+_GLOB_FLAGS = re.IGNORECASE if os.name == "nt" else 0
+
+# Stand-in for an empty set of globs
+_NEVER_MATCH = re.compile(r"(?!)")
+
+# "*.ext" patterns that can be answered with a set lookup on the extension
+_SUFFIX_GLOB = re.compile(r"\*\.([^*?\[\]./]+)")
+
+# Reading and writing files is I/O bound, so use more threads than cores
+_IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Parts whose sources may be read ahead of the parts being written (see _ReadAhead)
+_READ_AHEAD_PARTS = 4
+
+# Version control and tool cache directories, which never hold project files; they are skipped
+# during the walk before any pattern matching happens. Build output and dependency directories
+# (build, dist, node_modules, ...) go through the ignore rules so a .gitignore can re-include them.
+_PRUNED_DIR_NAMES = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+    }
+)
+
+# Chunk size for copying file content into a part; also the part file's write buffer size
+_COPY_CHUNK = 1 << 20
+
+# Characters replaced by "-" in heading anchors
+_ANCHOR_TRANS = str.maketrans("/._", "---")
+
+# Approximate markdown added per file (TOC entry, heading, metadata, fences), used when
+# sizing parts so that many small files cost more than their raw bytes suggest
+_FILE_OVERHEAD_BYTES = 512
+
+# Extensions that are always treated as text, without sniffing the content
+_TEXT_EXTENSIONS = frozenset(
+    {
+        ".py",
+        ".js",
+        ".ts",
+        ".jsx",
+        ".tsx",
+        ".html",
+        ".css",
+        ".scss",
+        ".sass",
+        ".java",
+        ".cpp",
+        ".c",
+        ".h",
+        ".hpp",
+        ".cs",
+        ".php",
+        ".rb",
+        ".go",
+        ".rs",
+        ".swift",
+        ".kt",
+        ".scala",
+        ".sh",
+        ".bash",
+        ".zsh",
+        ".fish",
+        ".sql",
+        ".json",
+        ".xml",
+        ".yaml",
+        ".yml",
+        ".toml",
+        ".ini",
+        ".cfg",
+        ".md",
+        ".txt",
+        ".rst",
+        ".tex",
+        ".vue",
+        ".svelte",
+        ".dart",
+        ".r",
+        ".pl",
+        ".pm",
+        ".lua",
+        ".vim",
+        ".el",
+        ".clj",
+        ".hs",
+        ".ml",
+        ".fs",
+        ".dockerfile",
+        ".makefile",
+        ".cmake",
+        ".gradle",
+        ".maven",
+    }
+)
+
+# Syntax highlighting language for each known extension
+_EXT_MAP = {
+    ".py": "python",
+    ".js": "javascript",
+    ".ts": "typescript",
+    ".jsx": "jsx",
+    ".tsx": "tsx",
+    ".html": "html",
+    ".css": "css",
+    ".scss": "scss",
+    ".sass": "sass",
+    ".java": "java",
+    ".cpp": "cpp",
+    ".c": "c",
+    ".h": "c",
+    ".hpp": "cpp",
+    ".cs": "csharp",
+    ".php": "php",
+    ".rb": "ruby",
+    ".go": "go",
+    ".rs": "rust",
+    ".swift": "swift",
+    ".kt": "kotlin",
+    ".scala": "scala",
+    ".sh": "bash",
+    ".bash": "bash",
+    ".zsh": "zsh",
+    ".sql": "sql",
+    ".json": "json",
+    ".xml": "xml",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".toml": "toml",
+    ".md": "markdown",
+    ".txt": "text",
+    ".vue": "vue",
+    ".dart": "dart",
+    ".r": "r",
+    ".pl": "perl",
+    ".lua": "lua",
+}
+
+# Patterns that are always ignored: common build artifacts, dependencies and cache directories
+_DEFAULT_IGNORE_PATTERNS = frozenset(
+    {
+        # Version control
+        ".git/*",
+        ".git/**",
+        ".svn/*",
+        ".svn/**",
+        ".hg/*",
+        ".hg/**",
+        ".bzr/*",
+        ".bzr/**",
+
+        # Python
+        "__pycache__/*",
+        "__pycache__/**",
+        "*.pyc",
+        "*.pyo",
+        "*.pyd",
+        ".pytest_cache/*",
+        ".pytest_cache/**",
+        ".coverage",
+        ".tox/*",
+        ".tox/**",
+        "venv/*",
+        "venv/**",
+        ".venv/*",
+        ".venv/**",
+        "env/*",
+        "env/**",
+        ".env",
+        "ENV/*",
+        "ENV/**",
+        "env.bak/*",
+        "env.bak/**",
+        "venv.bak/*",
+        "venv.bak/**",
+        "pip-log.txt",
+        "pip-delete-this-directory.txt",
+        ".mypy_cache/*",
+        ".mypy_cache/**",
+        ".dmypy.json",
+        "dmypy.json",
+
+        # Node.js / JavaScript / TypeScript
+        "node_modules/*",
+        "node_modules/**",
+        "npm-debug.log*",
+        "yarn-debug.log*",
+        "yarn-error.log*",
+        "lerna-debug.log*",
+        ".pnpm-debug.log*",
+        ".npm",
+        ".yarn/*",
+        ".yarn/**",
+        ".pnp",
+        ".pnp.js",
+        ".yarn/cache",
+        ".yarn/unplugged",
+        ".yarn/build-state.yml",
+        ".yarn/install-state.gz",
+        ".pnp.*",
+
+        # Build outputs and dist directories
+        "dist/*",
+        "dist/**",
+        "build/*",
+        "build/**",
+        "out/*",
+        "out/**",
+        "target/*",
+        "target/**",
+        "bin/*",
+        "bin/**",
+        "obj/*",
+        "obj/**",
+
+        # Next.js
+        ".next/*",
+        ".next/**",
+        ".next",
+
+        # Nuxt.js
+        ".nuxt/*",
+        ".nuxt/**",
+        ".output/*",
+        ".output/**",
+
+        # Vite
+        ".vite/*",
+        ".vite/**",
+
+        # Webpack
+        ".webpack/*",
+        ".webpack/**",
+
+        # Parcel
+        ".parcel-cache/*",
+        ".parcel-cache/**",
+
+        # Rollup
+        ".rollup.cache/*",
+        ".rollup.cache/**",
+
+        # SvelteKit
+        ".svelte-kit/*",
+        ".svelte-kit/**",
+
+        # Gatsby
+        ".cache/*",
+        ".cache/**",
+        "public/*",
+        "public/**",
+
+        # React Native
+        ".expo/*",
+        ".expo/**",
+        ".expo-shared/*",
+        ".expo-shared/**",
+
+        # Flutter
+        ".dart_tool/*",
+        ".dart_tool/**",
+        ".flutter-plugins",
+        ".flutter-plugins-dependencies",
+        ".packages",
+        ".pub-cache/*",
+        ".pub-cache/**",
+        ".pub/*",
+        ".pub/**",
+
+        # Java / Maven / Gradle
+        ".m2/*",
+        ".m2/**",
+        ".gradle/*",
+        ".gradle/**",
+        "gradle/*",
+        "gradle/**",
+        "gradlew",
+        "gradlew.bat",
+
+        # .NET
+        "packages/*",
+        "packages/**",
+        "*.nupkg",
+        "*.snupkg",
+        ".vs/*",
+        ".vs/**",
+
+        # Go
+        "vendor/*",
+        "vendor/**",
+
+        # Rust
+        "target/*",
+        "target/**",
+        "Cargo.lock",
+
+        # Ruby
+        ".bundle/*",
+        ".bundle/**",
+        "vendor/bundle/*",
+        "vendor/bundle/**",
+
+        # PHP
+        "vendor/*",
+        "vendor/**",
+        "composer.phar",
+
+        # IDEs and editors
+        ".vscode/*",
+        ".vscode/**",
+        ".idea/*",
+        ".idea/**",
+        "*.swp",
+        "*.swo",
+        "*~",
+        ".project",
+        ".classpath",
+        ".c9revisions/*",
+        ".c9revisions/**",
+        ".settings/*",
+        ".settings/**",
+        "*.sublime-project",
+        "*.sublime-workspace",
+
+        # OS generated files
+        ".DS_Store",
+        ".DS_Store?",
+        "._*",
+        ".Spotlight-V100",
+        ".Trashes",
+        "ehthumbs.db",
+        "Thumbs.db",
+        "Desktop.ini",
+
+        # Logs and temporary files
+        "*.log",
+        "*.tmp",
+        "*.temp",
+        "logs/*",
+        "logs/**",
+        "log/*",
+        "log/**",
+        "tmp/*",
+        "tmp/**",
+        "temp/*",
+        "temp/**",
+
+        # Database files
+        "*.db",
+        "*.sqlite",
+        "*.sqlite3",
+
+        # Coverage reports
+        "coverage/*",
+        "coverage/**",
+        ".nyc_output/*",
+        ".nyc_output/**",
+        "lcov.info",
+
+        # Documentation builds
+        "_site/*",
+        "_site/**",
+        "site/*",
+        "site/**",
+        "docs/_build/*",
+        "docs/_build/**",
+
+        # Backup files
+        "*.bak",
+        "*.backup",
+        "*.old",
+
+        # Lock files (keep some, but exclude others)
+        "package-lock.json",
+        "yarn.lock",
+        "pnpm-lock.yaml",
+
+        # Docker
+        ".dockerignore",
+
+        # Terraform
+        ".terraform/*",
+        ".terraform/**",
+        "*.tfstate",
+        "*.tfstate.*",
+        ".terraform.lock.hcl",
+
+        # Kubernetes
+        "*.kubeconfig",
+
+        # Security and secrets
+        ".env.local",
+        ".env.development.local",
+        ".env.test.local",
+        ".env.production.local",
+        "*.pem",
+        "*.key",
+        "*.p12",
+        "*.p8",
+        "*.mobileprovision",
+
+        # Miscellaneous
+        "*.pid",
+        "*.seed",
+        "*.pid.lock",
+        ".grunt",
+        "bower_components/*",
+        "bower_components/**",
+        ".lock-wscript",
+        ".wafpickle-*",
+        ".eslintcache",
+        ".stylelintcache",
+    }
+)
+
+# Extension-less file names that are commonly text
+_TEXT_NAMES = frozenset({"dockerfile", "makefile", "readme", "license", "changelog"})
+
+# How much of an unknown file is sniffed for binary content
+_SNIFF_BYTES = 4096
+
+# Bytes that may appear in text: tab, newlines, form feed, carriage return and everything from space up.
+# Deleting them from a sniffed chunk leaves only the control characters.
+_TEXT_BYTES = bytes(range(9, 14)) + bytes(range(32, 256))
+
+
+def _path_sort_key(path: Path) -> str:
+    """Sort key that orders paths like Path comparison does, but compares as one C-level string
+
+    Path objects compare part by part; joining the parts with NUL, which sorts below every
+    character allowed in a file name, gives the same order.
+    """
+    return os.path.normcase(str(path)).replace(os.sep, "\0")
+
+
+def _translate_gitignore(pattern: str) -> str:
+    """Translate one gitignore glob into a regex body, following git's wildmatch rules
+
+    "*", "?" and bracket expressions never match "/", while a "**" path segment matches
+    any number of directories.
+    """
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/"):
+                if i + 2 == n:
+                    out.append(".*")
+                    break
+                if pattern[i + 2] == "/":
+                    out.append("(?:.*/)?")
+                    i += 3
+                    continue
+            while i < n and pattern[i] == "*":
+                i += 1
+            out.append("[^/]*")
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = i + 1
+            if j < n and pattern[j] in "!^":
+                j += 1
+            if j < n and pattern[j] == "]":
+                j += 1
+            j = pattern.find("]", j)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                chars = pattern[i + 1 : j]
+                negate = chars[0] in "!^"
+                if negate:
+                    chars = chars[1:]
+                chars = "".join(ch if ch == "-" else re.escape(ch) for ch in chars)
+                out.append(f"(?!/)[{'^' if negate else ''}{chars}]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=None)
+def _language_for_suffix(suffix: str) -> str:
+    """Syntax highlighting language for a file suffix, in any case; there are only a few distinct suffixes"""
+    return _EXT_MAP.get(suffix.lower(), "text")
+
+
+class GitignoreRule(NamedTuple):
+    """Consecutive .gitignore lines sharing the same flags, fused into one regex"""
+
+    regex: Pattern  # matched against the path relative to the .gitignore's directory
+    negated: bool  # "!pattern": re-include what earlier lines excluded
+    dir_only: bool  # "pattern/": only matches directories
+
+
+class IgnoreRules(NamedTuple):
+    """Ignore patterns for one root, precompiled and grouped by how they are matched"""
+
+    dir_names: FrozenSet[str]  # exact names; matching a directory skips its whole subtree
+    suffixes: FrozenSet[str]  # extensions (without the dot) from simple "*.ext" patterns
+    name_re: Pattern  # union of globs matched against each file/directory name
+    path_re: Pattern  # union of globs matched against the path relative to the root
+    gitignore: Tuple[GitignoreRule, ...] = ()  # the root's .gitignore, in file order
+
+
+class _ReadAhead:
+    """Reads the sources of each part in part order, a bounded number of parts ahead of the writers
+
+    Transformed content is held in memory until its part is written, so reading every part up
+    front would hold the whole codebase; this keeps it to the parts in flight plus the window.
+    """
+
+    def __init__(
+        self,
+        readers: ThreadPoolExecutor,
+        read: Callable[[Path], Tuple[bytes, int, float]],
+        buckets: List[List[Path]],
+        window: int = _READ_AHEAD_PARTS,
+    ):
+        self._readers = readers
+        self._read = read
+        self._buckets = buckets
+        self._window = window
+        self._submitted = 0
+        self._pending: Dict[int, List[Tuple[Path, "Future[Tuple[bytes, int, float]]"]]] = {}
+        self._lock = threading.Lock()
+        with self._lock:
+            self._submit_until(window)
+
+    def _submit_until(self, stop: int):
+        """Queue the reads of every part before index stop (called with the lock held)"""
+        stop = min(stop, len(self._buckets))
+        while self._submitted < stop:
+            bucket = self._buckets[self._submitted]
+            self._pending[self._submitted] = [
+                (file_path, self._readers.submit(self._read, file_path)) for file_path in bucket
+            ]
+            self._submitted += 1
+
+    def fetch(self, part_index: int) -> Dict[Path, Tuple[bytes, int, float]]:
+        """Wait for one part's reads, queueing the next parts' reads first"""
+        with self._lock:
+            self._submit_until(part_index + 1 + self._window)
+            futures = self._pending.pop(part_index)
+        return {file_path: future.result() for file_path, future in futures}
+
 
 class CodebaseConsolidator:
     def __init__(
@@ -19,597 +584,537 @@ class CodebaseConsolidator:
         use_xml: bool = False,
         include_tree: bool = True,
         max_part_size: int = 512000,  # Default 500KB
+        contiguous: bool = False,  # parts are runs of consecutive files rather than size-balanced
     ):
+        if isinstance(root_paths, (str, os.PathLike)):
+            root_paths = [root_paths]
+        # Resolved, so already absolute: headers and the index print these as they are
         self.root_paths = [Path(p).resolve() for p in root_paths]
         self.target_files = target_files
         self.use_xml = use_xml
         self.include_tree = include_tree
         self.max_part_size = max_part_size
-        self.gitignore_rules = {path: self._load_gitignore(path) for path in self.root_paths}
-
-    def _load_gitignore(self, root_path: Path) -> Set[str]:
-        """Load patterns from .gitignore file for a specific root"""
-        patterns = set()
+        self.contiguous = contiguous
+        # "Sources" line shared by every part header
+        self._sources = ", ".join([f"`{p}`" for p in self.root_paths])
+        gitignore_lines = {path: self._read_gitignore(path) for path in self.root_paths}
+        self.gitignore_rules = {path: self._load_gitignore(path, lines) for path, lines in gitignore_lines.items()}
+
+        # The built-in patterns are plain globs that can be grouped freely; .gitignore lines keep
+        # git's semantics (order, negation, anchoring) and take precedence over them
+        default_rules = self._compile_ignore_rules(_DEFAULT_IGNORE_PATTERNS)
+        self.ignore_rules = {
+            path: default_rules._replace(gitignore=self._compile_gitignore(lines))
+            for path, lines in gitignore_lines.items()
+        }
+        # (size, mtime) per collected file, filled from the directory walk
+        self._file_stats: Dict[Path, Tuple[int, float]] = {}
+        # Compiled rules of each nested .gitignore read so far, by directory, see _enter_dir
+        self._nested_gitignore: Dict[str, Tuple[GitignoreRule, ...]] = {}
+        # Display path (root name + relative path) per file, see _get_rel_path_with_root
+        self._rel_paths: Dict[Path, Path] = {}
+        # The same display path as a forward-slash string, see _get_rel_posix_path
+        self._rel_posix_paths: Dict[Path, str] = {}
+        # Last rendered file tree as (file list, tree); every part of a run shows the same tree
+        self._file_tree: Optional[Tuple[List[Path], str]] = None
+        self._file_tree_lock = threading.Lock()
+        # Timestamp shared by every document of one consolidate() run
+        self._generated_at: Optional[str] = None
+
+    def _read_gitignore(self, root_path: Path) -> List[str]:
+        """Read the pattern lines of a directory's .gitignore file, in file order"""
         gitignore_path = root_path / ".gitignore"
 
-        if gitignore_path.exists():
+        # Open directly instead of probing with exists() first, which would cost a second stat
+        try:
             with open(gitignore_path, "r", encoding="utf-8", errors="ignore") as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#"):
-                        patterns.add(line)
-
-        # Add comprehensive patterns to ignore common build artifacts, dependencies, and cache directories
-        patterns.update(
-            {
-                # Version control
-                ".git/*",
-                ".git/**",
-                ".svn/*",
-                ".svn/**",
-                ".hg/*",
-                ".hg/**",
-                ".bzr/*",
-                ".bzr/**",
-
-                # Python
-                "__pycache__/*",
-                "__pycache__/**",
-                "*.pyc",
-                "*.pyo",
-                "*.pyd",
-                ".pytest_cache/*",
-                ".pytest_cache/**",
-                ".coverage",
-                ".tox/*",
-                ".tox/**",
-                "venv/*",
-                "venv/**",
-                ".venv/*",
-                ".venv/**",
-                "env/*",
-                "env/**",
-                ".env",
-                "ENV/*",
-                "ENV/**",
-                "env.bak/*",
-                "env.bak/**",
-                "venv.bak/*",
-                "venv.bak/**",
-                "pip-log.txt",
-                "pip-delete-this-directory.txt",
-                ".mypy_cache/*",
-                ".mypy_cache/**",
-                ".dmypy.json",
-                "dmypy.json",
-
-                # Node.js / JavaScript / TypeScript
-                "node_modules/*",
-                "node_modules/**",
-                "npm-debug.log*",
-                "yarn-debug.log*",
-                "yarn-error.log*",
-                "lerna-debug.log*",
-                ".pnpm-debug.log*",
-                ".npm",
-                ".yarn/*",
-                ".yarn/**",
-                ".pnp",
-                ".pnp.js",
-                ".yarn/cache",
-                ".yarn/unplugged",
-                ".yarn/build-state.yml",
-                ".yarn/install-state.gz",
-                ".pnp.*",
-
-                # Build outputs and dist directories
-                "dist/*",
-                "dist/**",
-                "build/*",
-                "build/**",
-                "out/*",
-                "out/**",
-                "target/*",
-                "target/**",
-                "bin/*",
-                "bin/**",
-                "obj/*",
-                "obj/**",
-
-                # Next.js
-                ".next/*",
-                ".next/**",
-                ".next",
-
-                # Nuxt.js
-                ".nuxt/*",
-                ".nuxt/**",
-                ".output/*",
-                ".output/**",
-
-                # Vite
-                ".vite/*",
-                ".vite/**",
-
-                # Webpack
-                ".webpack/*",
-                ".webpack/**",
-
-                # Parcel
-                ".parcel-cache/*",
-                ".parcel-cache/**",
-
-                # Rollup
-                ".rollup.cache/*",
-                ".rollup.cache/**",
-
-                # SvelteKit
-                ".svelte-kit/*",
-                ".svelte-kit/**",
-
-                # Gatsby
-                ".cache/*",
-                ".cache/**",
-                "public/*",
-                "public/**",
-
-                # React Native
-                ".expo/*",
-                ".expo/**",
-                ".expo-shared/*",
-                ".expo-shared/**",
-
-                # Flutter
-                ".dart_tool/*",
-                ".dart_tool/**",
-                ".flutter-plugins",
-                ".flutter-plugins-dependencies",
-                ".packages",
-                ".pub-cache/*",
-                ".pub-cache/**",
-                ".pub/*",
-                ".pub/**",
-
-                # Java / Maven / Gradle
-                ".m2/*",
-                ".m2/**",
-                ".gradle/*",
-                ".gradle/**",
-                "gradle/*",
-                "gradle/**",
-                "gradlew",
-                "gradlew.bat",
-
-                # .NET
-                "packages/*",
-                "packages/**",
-                "*.nupkg",
-                "*.snupkg",
-                ".vs/*",
-                ".vs/**",
-
-                # Go
-                "vendor/*",
-                "vendor/**",
-
-                # Rust
-                "target/*",
-                "target/**",
-                "Cargo.lock",
-
-                # Ruby
-                ".bundle/*",
-                ".bundle/**",
-                "vendor/bundle/*",
-                "vendor/bundle/**",
-
-                # PHP
-                "vendor/*",
-                "vendor/**",
-                "composer.phar",
-
-                # IDEs and editors
-                ".vscode/*",
-                ".vscode/**",
-                ".idea/*",
-                ".idea/**",
-                "*.swp",
-                "*.swo",
-                "*~",
-                ".project",
-                ".classpath",
-                ".c9revisions/*",
-                ".c9revisions/**",
-                ".settings/*",
-                ".settings/**",
-                "*.sublime-project",
-                "*.sublime-workspace",
-
-                # OS generated files
-                ".DS_Store",
-                ".DS_Store?",
-                "._*",
-                ".Spotlight-V100",
-                ".Trashes",
-                "ehthumbs.db",
-                "Thumbs.db",
-                "Desktop.ini",
-
-                # Logs and temporary files
-                "*.log",
-                "*.tmp",
-                "*.temp",
-                "logs/*",
-                "logs/**",
-                "log/*",
-                "log/**",
-                "tmp/*",
-                "tmp/**",
-                "temp/*",
-                "temp/**",
-
-                # Database files
-                "*.db",
-                "*.sqlite",
-                "*.sqlite3",
-
-                # Coverage reports
-                "coverage/*",
-                "coverage/**",
-                ".nyc_output/*",
-                ".nyc_output/**",
-                "lcov.info",
-
-                # Documentation builds
-                "_site/*",
-                "_site/**",
-                "site/*",
-                "site/**",
-                "docs/_build/*",
-                "docs/_build/**",
-
-                # Backup files
-                "*.bak",
-                "*.backup",
-                "*.old",
-
-                # Lock files (keep some, but exclude others)
-                "package-lock.json",
-                "yarn.lock",
-                "pnpm-lock.yaml",
-
-                # Docker
-                ".dockerignore",
-
-                # Terraform
-                ".terraform/*",
-                ".terraform/**",
-                "*.tfstate",
-                "*.tfstate.*",
-                ".terraform.lock.hcl",
-
-                # Kubernetes
-                "*.kubeconfig",
-
-                # Security and secrets
-                ".env.local",
-                ".env.development.local",
-                ".env.test.local",
-                ".env.production.local",
-                "*.pem",
-                "*.key",
-                "*.p12",
-                "*.p8",
-                "*.mobileprovision",
-
-                # Miscellaneous
-                "*.pid",
-                "*.seed",
-                "*.pid.lock",
-                ".grunt",
-                "bower_components/*",
-                "bower_components/**",
-                ".lock-wscript",
-                ".wafpickle-*",
-                ".eslintcache",
-                ".stylelintcache",
-            }
-        )
+                text = f.read()
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return []
+
+        # Text mode has already turned \r\n and \r into \n, so this splits like iterating the file
+        stripped = [line.strip() for line in text.split("\n")]
+        return [line for line in stripped if line and not line.startswith("#")]
+
+    def _load_gitignore(self, root_path: Path, lines: Optional[List[str]] = None) -> Set[str]:
+        """Load patterns from .gitignore file for a specific root"""
+        patterns = set(self._read_gitignore(root_path) if lines is None else lines)
+        patterns.update(_DEFAULT_IGNORE_PATTERNS)
 
         return patterns
 
     def _get_rel_path_with_root(self, file_path: Path) -> Path:
         """Get relative path prefixed with the root directory name"""
-        for root in self.root_paths:
-            try:
-                rel_path = file_path.relative_to(root)
-                return Path(root.name) / rel_path
-            except ValueError:
+        # Each file's path is shown in its TOC entry, heading, metadata, code block and anchor
+        rel_path = self._rel_paths.get(file_path)
+        if rel_path is None:
+            rel_path = file_path
+            for root in self.root_paths:
+                try:
+                    rel_path = Path(root.name) / file_path.relative_to(root)
+                    break
+                except ValueError:
+                    continue
+            self._rel_paths[file_path] = rel_path
+        return rel_path
+
+    def _get_rel_posix_path(self, file_path: Path) -> str:
+        """Get the display path with forward slashes, as used in anchors and code blocks"""
+        rel_posix = self._rel_posix_paths.get(file_path)
+        if rel_posix is None:
+            rel_posix = self._rel_posix_paths[file_path] = self._get_rel_path_with_root(file_path).as_posix()
+        return rel_posix
+
+    def _compile_ignore_rules(self, patterns: Set[str]) -> IgnoreRules:
+        """Sort ignore patterns once into directory names, basename globs and path globs"""
+        dir_names = set()
+        suffixes = set()
+        name_globs = []
+        path_globs = []
+
+        for pattern in patterns:
+            # Directory patterns ending with / ignore everything below that directory
+            if pattern.endswith("/"):
+                dir_names.add(pattern[:-1])
+
+            # Patterns with /* or /** (directory contents) skip that directory
+            elif pattern.endswith("/*") or pattern.endswith("/**"):
+                directory = pattern.rsplit("/", 1)[0]
+                if "/" in directory:
+                    path_globs.append(directory)
+                else:
+                    dir_names.add(directory)
+
+            # Exact names (like node_modules, .vite, .DS_Store) match any path component
+            elif "/" not in pattern and "*" not in pattern:
+                dir_names.add(pattern)
+
+            # Simple extension globs like *.pyc or *.log
+            elif _SUFFIX_GLOB.fullmatch(pattern):
+                suffix = pattern[2:]
+                suffixes.add(suffix.lower() if _GLOB_FLAGS else suffix)
+
+            # Other glob patterns without a slash match a file or directory name
+            elif "/" not in pattern:
+                name_globs.append(pattern)
+
+            # Everything else is matched against the full relative path
+            else:
+                path_globs.append(pattern)
+
+        return IgnoreRules(
+            frozenset(dir_names),
+            frozenset(suffixes),
+            self._compile_globs(name_globs),
+            self._compile_globs(path_globs),
+        )
+
+    def _compile_globs(self, globs: List[str]) -> Pattern:
+        """Fuse glob patterns into a single regex, so matching is one call instead of one per pattern"""
+        if not globs:
+            return _NEVER_MATCH
+        # Each translated glob is self-contained ((?s:...)\Z), so a plain alternation is safe
+        return re.compile("|".join(fnmatch.translate(glob) for glob in sorted(globs)), _GLOB_FLAGS)
+
+    def _compile_gitignore(self, lines: List[str]) -> Tuple[GitignoreRule, ...]:
+        """Compile .gitignore lines into ordered rules, fusing runs of lines with the same flags"""
+        groups: List[Tuple[List[str], bool, bool]] = []
+
+        for line in lines:
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
                 continue
-        return file_path
 
-    def _is_ignored(self, file_path: Path, root_path: Path) -> bool:
-        """Check if file should be ignored based on .gitignore patterns"""
-        try:
-            relative_path = file_path.relative_to(root_path)
-        except ValueError:
-            return True
+            # A slash anywhere but at the end anchors the pattern to the .gitignore's directory;
+            # otherwise it matches a name at any depth
+            anchored = "/" in line
+            body = _translate_gitignore(line.lstrip("/"))
+            if not anchored:
+                body = "(?:.*/)?" + body
 
-        path_str = str(relative_path).replace("\\", "/")  # Normalize path separators
+            if groups and groups[-1][1:] == (negated, dir_only):
+                groups[-1][0].append(body)
+            else:
+                groups.append(([body], negated, dir_only))
 
-        for pattern in self.gitignore_rules.get(root_path, set()):
-            # Handle directory patterns ending with /
-            if pattern.endswith("/"):
-                dir_name = pattern[:-1]
-                if any(part == dir_name for part in relative_path.parts):
-                    return True
+        return tuple(
+            GitignoreRule(re.compile(f"(?:{'|'.join(bodies)})\\Z", _GLOB_FLAGS), negated, dir_only)
+            for bodies, negated, dir_only in groups
+        )
 
-            # Handle patterns with /* or /** (directory contents)
-            elif pattern.endswith("/*") or pattern.endswith("/**"):
-                dir_pattern = pattern.split("/")[0]
-                if any(part == dir_pattern for part in relative_path.parts):
-                    return True
+    def _match_gitignore(
+        self, levels: Tuple[Tuple[str, Tuple[GitignoreRule, ...]], ...], rel_path: str, is_dir: bool
+    ) -> Optional[bool]:
+        """Decide a path with .gitignore rules: True if ignored, False if re-included, None if unmatched
+
+        levels holds (directory prefix, rules) pairs from the root down; deeper files and later
+        lines win, as in git.
+        """
+        for base, rules in reversed(levels):
+            path = rel_path[len(base) :]
+            for rule in reversed(rules):
+                if rule.dir_only and not is_dir:
+                    continue
+                if rule.regex.match(path):
+                    return not rule.negated
+        return None
+
+    @property
+    def ignored_patterns(self) -> Set[str]:
+        """All raw ignore patterns across every root"""
+        return set().union(*self.gitignore_rules.values())
+
+    def _is_ignored_name(self, name: str, rules: IgnoreRules) -> bool:
+        """Check a single file or directory name against the name-based rules"""
+        if name in rules.dir_names:
+            return True
 
-            # Handle exact directory matches (like node_modules, .vite, etc.)
-            elif "/" not in pattern and "*" not in pattern:
-                if any(part == pattern for part in relative_path.parts):
-                    return True
+        _, dot, suffix = name.rpartition(".")
+        if dot and (suffix.lower() if _GLOB_FLAGS else suffix) in rules.suffixes:
+            return True
 
-            # Handle glob patterns for filenames
-            elif fnmatch.fnmatch(file_path.name, pattern):
-                return True
+        return rules.name_re.match(name) is not None
 
-            # Handle full path glob patterns
-            elif fnmatch.fnmatch(path_str, pattern):
-                return True
+    def _is_entry_ignored(
+        self, levels: Tuple[Tuple[str, Tuple[GitignoreRule, ...]], ...], rules: IgnoreRules, name: str, rel_path: str, is_dir: bool
+    ) -> bool:
+        """Decide whether the directory walk skips one entry, given the .gitignore levels above it"""
+        if is_dir and name in _PRUNED_DIR_NAMES:
+            return True
+        decision = self._match_gitignore(levels, rel_path, is_dir) if levels else None
+        if decision is None:
+            return self._is_ignored_name(name, rules) or rules.path_re.match(rel_path) is not None
+        return decision
+
+    def _enter_dir(
+        self, levels: Tuple[Tuple[str, Tuple[GitignoreRule, ...]], ...], dir_path: str, rel_dir: str
+    ) -> Tuple[Tuple[str, Tuple[GitignoreRule, ...]], ...]:
+        """Add the rules of the .gitignore in dir_path (rel_dir below the root, ending in "/") to levels"""
+        nested = self._nested_gitignore.get(dir_path)
+        if nested is None:
+            nested = self._compile_gitignore(self._read_gitignore(Path(dir_path)))
+            self._nested_gitignore[dir_path] = nested
+        return levels + ((rel_dir, nested),) if nested else levels
+
+    def _is_ignored(self, file_path: Path, root_path: Path) -> bool:
+        """Check if file should be ignored based on the built-in and (nested) .gitignore patterns"""
+        try:
+            relative_path = file_path.relative_to(root_path)
+        except ValueError:
+            return True
 
-            # Handle ** patterns (recursive)
-            elif "**" in pattern:
-                if fnmatch.fnmatch(path_str, pattern):
-                    return True
+        rules = self.ignore_rules.get(root_path)
+        if rules is None:
+            return False
 
+        # Check each ancestor directory and then the file itself the way the directory walk does
+        levels = (("", rules.gitignore),) if rules.gitignore else ()
+        parts = relative_path.parts
+        current_dir = str(root_path)
+        for i, name in enumerate(parts):
+            rel_path = "/".join(parts[: i + 1])
+            is_dir = i < len(parts) - 1
+            if self._is_entry_ignored(levels, rules, name, rel_path, is_dir):
+                return True
+            if is_dir:
+                current_dir = os.path.join(current_dir, name)
+                levels = self._enter_dir(levels, current_dir, rel_path + "/")
         return False
 
     def _is_text_file(self, file_path: Path) -> bool:
         """Determine if a file is likely a text file"""
-        text_extensions = {
-            ".py",
-            ".js",
-            ".ts",
-            ".jsx",
-            ".tsx",
-            ".html",
-            ".css",
-            ".scss",
-            ".sass",
-            ".java",
-            ".cpp",
-            ".c",
-            ".h",
-            ".hpp",
-            ".cs",
-            ".php",
-            ".rb",
-            ".go",
-            ".rs",
-            ".swift",
-            ".kt",
-            ".scala",
-            ".sh",
-            ".bash",
-            ".zsh",
-            ".fish",
-            ".sql",
-            ".json",
-            ".xml",
-            ".yaml",
-            ".yml",
-            ".toml",
-            ".ini",
-            ".cfg",
-            ".md",
-            ".txt",
-            ".rst",
-            ".tex",
-            ".vue",
-            ".svelte",
-            ".dart",
-            ".r",
-            ".pl",
-            ".pm",
-            ".lua",
-            ".vim",
-            ".el",
-            ".clj",
-            ".hs",
-            ".ml",
-            ".fs",
-            ".dockerfile",
-            ".makefile",
-            ".cmake",
-            ".gradle",
-            ".maven",
-        }
-
         # Check extension
-        if file_path.suffix.lower() in text_extensions:
+        if file_path.suffix.lower() in _TEXT_EXTENSIONS:
             return True
 
         # Check for files without extensions that are commonly text
-        if not file_path.suffix:
-            text_names = {"dockerfile", "makefile", "readme", "license", "changelog"}
-            if file_path.name.lower() in text_names:
-                return True
+        if not file_path.suffix and file_path.name.lower() in _TEXT_NAMES:
+            return True
 
-        # Try to read a small portion to check if it's text
+        # Sniff the first few KB with a raw read: NUL bytes, invalid UTF-8 or lots of control
+        # characters mean binary
         try:
-            with open(file_path, "r", encoding="utf-8", errors="strict") as f:
-                f.read(1024)  # Try to read first 1KB
-            return True
-        except (UnicodeDecodeError, IOError):
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            try:
+                chunk = os.read(fd, _SNIFF_BYTES)
+            finally:
+                os.close(fd)
+        except OSError:
             return False
 
+        if b"\0" in chunk:
+            return False
+
+        # The output is UTF-8, so the content has to be too; a full chunk may end partway
+        # through a multibyte character, which the incremental decoder holds back instead
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(chunk, final=len(chunk) < _SNIFF_BYTES)
+        except UnicodeDecodeError:
+            return False
+        return len(chunk.translate(None, _TEXT_BYTES)) <= len(chunk) // 8
+
     def _generate_file_tree(self, files: List[Path]) -> str:
         """Generate a visual tree structure of the files from multiple roots"""
         if not files:
             return ""
 
-        # Build a nested dictionary structure
-        tree = {}
-        for file_path in files:
-            # Use prefixed path so different roots don't collide at the top level
-            prefixed_path = self._get_rel_path_with_root(file_path)
-            parts = prefixed_path.parts
-            current = tree
-            for part in parts:
-                if part not in current:
-                    current[part] = {}
-                current = current[part]
-
-        def render_tree(node, prefix=""):
-            lines = []
-            keys = sorted(node.keys())
-            for i, key in enumerate(keys):
-                is_last = i == len(keys) - 1
-                connector = "└── " if is_last else "├── "
-
-                # Check if it's a leaf (file) or branch (directory)
-                if not node[key]:  # Empty dict means it's a file
-                    lines.append(f"{prefix}{connector}{key}")
+        # Sorting the part tuples gives the same depth-first order as rendering a nested dict with
+        # sorted children, so the tree can be emitted in one pass. Prefixed paths keep different
+        # roots from colliding at the top level.
+        paths = sorted(self._get_rel_path_with_root(file_path).parts for file_path in files)
+
+        # shared[i]: number of leading parts paths[i] has in common with paths[i + 1]
+        shared = []
+        for current, following in zip(paths, paths[1:]):
+            depth, limit = 0, min(len(current), len(following))
+            while depth < limit and current[depth] == following[depth]:
+                depth += 1
+            shared.append(depth)
+
+        # Walk backwards to find which nodes have a later sibling; the nodes a path adds start
+        # where it stops sharing parts with the previous path
+        has_sibling: List[List[bool]] = [[]] * len(paths)
+        pending: List[bool] = []
+        for i in range(len(paths) - 1, -1, -1):
+            parts = paths[i]
+            if i == len(paths) - 1:
+                pending = [False] * len(parts)
+            else:
+                depth = shared[i]
+                pending = pending[:depth] + [True] + [False] * (len(parts) - depth - 1)
+            has_sibling[i] = pending[shared[i - 1] if i else 0 :]
+
+        lines = ["."]
+        prefixes = [""]  # prefixes[d]: indentation in front of nodes at depth d
+        for i, parts in enumerate(paths):
+            start = shared[i - 1] if i else 0
+            del prefixes[start + 1 :]
+            for depth in range(start, len(parts)):
+                more = has_sibling[i][depth - start]
+                connector = "├── " if more else "└── "
+                if depth == len(parts) - 1:
+                    lines.append(f"{prefixes[depth]}{connector}{parts[depth]}")
                 else:
-                    lines.append(f"{prefix}{connector}{key}/")
-                    extension = "    " if is_last else "│   "
-                    lines.extend(render_tree(node[key], prefix + extension))
-            return lines
-
-        return "\n".join(["."] + render_tree(tree))
+                    lines.append(f"{prefixes[depth]}{connector}{parts[depth]}/")
+                    prefixes.append(prefixes[depth] + ("│   " if more else "    "))
+
+        return "\n".join(lines)
+
+    def _get_file_tree(self, files: List[Path]) -> str:
+        """Get the rendered tree for files, reusing it while the same file list is passed in"""
+        cached = self._file_tree
+        if cached is None or cached[0] is not files:
+            # Part writers run in parallel; let one of them render while the others wait
+            with self._file_tree_lock:
+                cached = self._file_tree
+                if cached is None or cached[0] is not files:
+                    cached = (files, self._generate_file_tree(files))
+                    self._file_tree = cached
+        return cached[1]
 
     def _collect_files(self) -> List[Path]:
         """Collect all text files that should be processed from all root paths"""
         files = []
+        self._file_stats = {}
+        self._nested_gitignore = {}
+        # The walk already knows each file's path relative to its root, so record display paths
+        # here; with nested roots the first matching root wins, so leave those to relative_to
+        seed_rel_paths = not any(
+            other != root and other in root.parents for root in self.root_paths for other in self.root_paths
+        )
+
+        # The loop below runs once per directory entry; bind the methods and dicts it uses to locals
+        is_entry_ignored = self._is_entry_ignored
+        enter_dir = self._enter_dir
+        is_text_file = self._is_text_file
+        file_stats = self._file_stats
+        rel_paths = self._rel_paths
 
         for root in self.root_paths:
-            for file_path in root.rglob("*"):
-                if file_path.is_file() and not self._is_ignored(file_path, root):
-                    if self._is_text_file(file_path):
-                        files.append(file_path)
+            rules = self.ignore_rules[root]
+
+            # Walk with os.scandir so ignored directories (.git, node_modules, ...) are never entered.
+            # Each stack item carries its path relative to the root, so parents are only checked once,
+            # and the .gitignore rules that apply to it (nested files add a level below the root's).
+            root_levels = (("", rules.gitignore),) if rules.gitignore else ()
+            stack = [(str(root), "", root_levels)]
+            while stack:
+                current_dir, rel_dir, levels = stack.pop()
+                try:
+                    with os.scandir(current_dir) as it:
+                        entries = list(it)
+                except OSError:
+                    continue
+
+                if rel_dir and any(entry.name == ".gitignore" for entry in entries):
+                    levels = enter_dir(levels, current_dir, rel_dir)
+
+                for entry in entries:
+                    name = entry.name
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    rel_path = f"{rel_dir}{name}"
+                    if is_entry_ignored(levels, rules, name, rel_path, is_dir):
+                        continue
+
+                    # Like the rglob walk this replaced: symlinked directories are not descended
+                    # into (no cycles), but symlinked files are followed and collected
+                    if is_dir:
+                        stack.append((entry.path, rel_path + "/", levels))
+                    elif entry.is_file():
+                        file_path = Path(entry.path)
+                        if is_text_file(file_path):
+                            files.append(file_path)
+                            file_stats[file_path] = self._entry_stat(entry)
+                            if seed_rel_paths:
+                                rel_paths[file_path] = Path(root.name, rel_path)
+
+        files.sort(key=_path_sort_key)
+        return files
+
+    def _entry_stat(self, entry: os.DirEntry) -> Tuple[int, float]:
+        """Get (size, mtime) for a directory entry; DirEntry caches the stat call"""
+        try:
+            stat = entry.stat()
+            return stat.st_size, stat.st_mtime
+        except OSError:
+            return 0, 0.0
 
-        return sorted(files)
+    def _get_file_stat(self, file_path: Path) -> Tuple[int, float]:
+        """Get (size, mtime), using the values recorded during collection when available"""
+        cached = self._file_stats.get(file_path)
+        if cached is not None:
+            return cached
+        try:
+            stat = file_path.stat()
+            return stat.st_size, stat.st_mtime
+        except OSError:
+            return 0, 0.0
 
     def _get_file_size(self, file_path: Path) -> int:
         """Get file size in bytes"""
-        try:
-            return file_path.stat().st_size
-        except OSError:
-            return 0
+        return self._get_file_stat(file_path)[0]
 
     def _distribute_files(self, files: List[Path]) -> List[List[Path]]:
         """Distribute files across target number of output files while respecting max size"""
         if not files:
             return []
 
-        # Calculate total size
-        total_size = sum(self._get_file_size(f) for f in files)
+        # A file's cost is its size plus the fixed markdown overhead it adds to a part
+        costs = {f: self._get_file_size(f) + _FILE_OVERHEAD_BYTES for f in files}
+        total_cost = sum(costs.values())
+
+        # Use enough parts to reach target_files and to keep parts under max_part_size,
+        # but never more parts than there are files
+        num_buckets = max(self.target_files, -(-total_cost // self.max_part_size))
+        num_buckets = min(num_buckets, len(files))
+
+        # Trivial partitions: everything fits in one part, or every file gets its own
+        if num_buckets == 1:
+            return [sorted(files, key=_path_sort_key)]
+        if num_buckets == len(files):
+            return [[file_path] for file_path in sorted(files, key=_path_sort_key)]
+
+        if self.contiguous:
+            return self._distribute_contiguous(sorted(files, key=_path_sort_key), costs, num_buckets)
+
+        # Longest-processing-time first: place the largest remaining file into the
+        # currently smallest part. Heap entries are (cost, file count, bucket index).
+        buckets: List[List[Path]] = [[] for _ in range(num_buckets)]
+        heap = [(0, 0, i) for i in range(num_buckets)]
+
+        for file_path in sorted(files, key=lambda f: costs[f], reverse=True):
+            file_cost = costs[file_path]
+            bucket_cost, bucket_count, idx = heap[0]
+
+            if bucket_count and bucket_cost + file_cost > self.max_part_size:
+                # Even the smallest part is full, so open a new one
+                idx = len(buckets)
+                buckets.append([])
+                heapq.heappush(heap, (file_cost, 1, idx))
+            else:
+                heapq.heapreplace(heap, (bucket_cost + file_cost, bucket_count + 1, idx))
 
-        # Determine target size per file (the smaller of total/target or max_part_size)
-        target_size_per_file = min(total_size // self.target_files, self.max_part_size)
+            buckets[idx].append(file_path)
 
-        # If the project is very small, ensure target_size_per_file isn't zero
-        if target_size_per_file == 0:
-            target_size_per_file = self.max_part_size
+        # Keep files in path order within a part, and parts ordered by their first file
+        buckets = [sorted(bucket, key=_path_sort_key) for bucket in buckets if bucket]
+        buckets.sort(key=lambda bucket: _path_sort_key(bucket[0]))
+        return buckets
 
-        buckets = []
-        current_bucket = []
-        current_size = 0
+    def _distribute_contiguous(
+        self, files: List[Path], costs: Dict[Path, int], num_buckets: int
+    ) -> List[List[Path]]:
+        """Split path-ordered files into consecutive runs, keeping the largest part as small as possible
 
+        Neighbouring files stay in the same part. The smallest workable part capacity is found by
+        binary search; each probe packs greedily, jumping a whole part at a time over prefix sums.
+        """
+        prefix = [0]
         for file_path in files:
-            file_size = self._get_file_size(file_path)
-
-            # If adding this file would exceed target size AND current bucket isn't empty
-            # OR if current_size + file_size would exceed the hard limit max_part_size
-            if (current_size + file_size > target_size_per_file and current_bucket) or \
-               (current_size + file_size > self.max_part_size and current_bucket):
-                buckets.append(current_bucket)
-                current_bucket = [file_path]
-                current_size = file_size
-            else:
-                current_bucket.append(file_path)
-                current_size += file_size
-
-        # Add the last bucket if it has files
-        if current_bucket:
-            buckets.append(current_bucket)
-
-        # If we have too few buckets and haven't exceeded the target_files, redistribute
-        # only if we don't violate max_part_size significantly
-        while len(buckets) < self.target_files:
-            # Find the largest bucket and split it
-            largest_idx = max(range(len(buckets)), key=lambda i: len(buckets[i]))
-            largest_bucket = buckets[largest_idx]
-
-            if len(largest_bucket) >= 2:
-                mid = len(largest_bucket) // 2
-                bucket1 = largest_bucket[:mid]
-                bucket2 = largest_bucket[mid:]
-                buckets[largest_idx] = bucket1
-                buckets.append(bucket2)
-            else:
-                break
-
-        return buckets[:max(self.target_files, len(buckets))]  # Allow exceeding target if needed for size constraints
+            prefix.append(prefix[-1] + costs[file_path])
+        largest = max(costs.values())
+
+        def parts_needed(capacity: int) -> int:
+            count = pos = 0
+            while pos < len(files):
+                pos = bisect.bisect_right(prefix, prefix[pos] + capacity) - 1
+                count += 1
+            return count
+
+        # Parts may only exceed max_part_size when a single file does; if that needs more parts
+        # than planned, use as many as it takes
+        capacity = max(self.max_part_size, largest)
+        needed = parts_needed(capacity)
+        if needed > num_buckets:
+            num_buckets = needed
+        else:
+            low = max(largest, -(-prefix[-1] // num_buckets))
+            while low < capacity:
+                mid = (low + capacity) // 2
+                if parts_needed(mid) <= num_buckets:
+                    capacity = mid
+                else:
+                    low = mid + 1
 
-    def _read_file_content(self, file_path: Path) -> str:
-        """Read file content safely"""
+        # Pack again at that capacity, leaving at least one file for each part still to come
+        # so exactly num_buckets parts are produced
+        buckets = []
+        pos = 0
+        for remaining in range(num_buckets - 1, -1, -1):
+            end = bisect.bisect_right(prefix, prefix[pos] + capacity) - 1
+            end = min(end, len(files) - remaining)
+            buckets.append(files[pos:end])
+            pos = end
+        return buckets
+
+    def _read_file_bytes(self, file_path: Path) -> bytes:
+        """Read raw file content safely"""
         try:
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            with open(file_path, "rb") as f:
                 return f.read()
         except IOError as e:
-            return f"Error reading file: {e}"
+            return f"Error reading file: {e}".encode("utf-8")
+
+    def _decode_content(self, raw: bytes) -> str:
+        """Decode raw file content, normalizing line endings like text mode does"""
+        return raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+    def _read_file_content(self, file_path: Path) -> str:
+        """Read file content safely"""
+        return self._decode_content(self._read_file_bytes(file_path))
+
+    def _read_file_data(self, file_path: Path) -> Tuple[bytes, int, float]:
+        """Read a file's raw content together with its size and modification time"""
+        size, mtime = self._get_file_stat(file_path)
+        return self._read_file_bytes(file_path), size, mtime
 
     def _get_language_from_extension(self, file_path: Path) -> str:
         """Get language identifier for syntax highlighting"""
-        ext_map = {
-            ".py": "python",
-            ".js": "javascript",
-            ".ts": "typescript",
-            ".jsx": "jsx",
-            ".tsx": "tsx",
-            ".html": "html",
-            ".css": "css",
-            ".scss": "scss",
-            ".sass": "sass",
-            ".java": "java",
-            ".cpp": "cpp",
-            ".c": "c",
-            ".h": "c",
-            ".hpp": "cpp",
-            ".cs": "csharp",
-            ".php": "php",
-            ".rb": "ruby",
-            ".go": "go",
-            ".rs": "rust",
-            ".swift": "swift",
-            ".kt": "kotlin",
-            ".scala": "scala",
-            ".sh": "bash",
-            ".bash": "bash",
-            ".zsh": "zsh",
-            ".sql": "sql",
-            ".json": "json",
-            ".xml": "xml",
-            ".yaml": "yaml",
-            ".yml": "yaml",
-            ".toml": "toml",
-            ".md": "markdown",
-            ".txt": "text",
-            ".vue": "vue",
-            ".dart": "dart",
-            ".r": "r",
-            ".pl": "perl",
-            ".lua": "lua",
-        }
-
-        return ext_map.get(file_path.suffix.lower(), "text")
+        return _language_for_suffix(file_path.suffix)
 
     def _generate_output_folder_name(self, custom_name: str = None) -> str:
         """Generate a descriptive output folder name"""
@@ -640,69 +1145,162 @@ class CodebaseConsolidator:
         output_path.mkdir(parents=True, exist_ok=True)
         return output_path
 
+    def _get_generated_at(self) -> str:
+        """Timestamp for the "Generated" lines: the run's start time, or now outside a run"""
+        return self._generated_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
     def _write_part_header(self, f, part_num: int, total_parts: int, file_count: int, all_files: List[Path] = None):
         """Write the header for a part file"""
-        f.write(f"# Codebase Part {part_num} of {total_parts}\n\n")
-        sources = ", ".join([f"`{p.absolute()}`" for p in self.root_paths])
-        f.write(f"**Sources:** {sources}  \n")
-        f.write(f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  \n")
-        f.write(f"**Files in this part:** {file_count}  \n\n")
+        f.write(
+            f"# Codebase Part {part_num} of {total_parts}\n\n"
+            f"**Sources:** {self._sources}  \n"
+            f"**Generated:** {self._get_generated_at()}  \n"
+            f"**Files in this part:** {file_count}  \n\n"
+        )
 
         if self.include_tree and all_files:
-            f.write("## 🌳 File Tree\n\n")
-            f.write("```text\n")
-            f.write(self._generate_file_tree(all_files))
-            f.write("\n```\n\n---\n\n")
+            f.write(f"## 🌳 File Tree\n\n```text\n{self._get_file_tree(all_files)}\n```\n\n---\n\n")
+
+    def _get_anchor(self, file_path: Path) -> str:
+        """Get the markdown heading anchor for a file"""
+        return self._get_rel_posix_path(file_path).translate(_ANCHOR_TRANS).lower()
 
-    def _write_toc(self, f, bucket: List[Path]):
+    def _write_toc(self, f, bucket: List[Path], anchors: Optional[Dict[Path, str]] = None):
         """Write the Table of Contents"""
-        f.write("## Table of Contents\n\n")
+        entries = []
         for j, file_path in enumerate(bucket):
             rel_path = self._get_rel_path_with_root(file_path)
-            anchor = (
-                rel_path.as_posix()
-                .replace("/", "-")
-                .replace(".", "-")
-                .replace("_", "-")
-                .lower()
-            )
-            f.write(f"{j + 1}. [{rel_path}](#{anchor})\n")
-        f.write("\n---\n\n")
+            anchor = anchors[file_path] if anchors else self._get_anchor(file_path)
+            entries.append(f"{j + 1}. [{rel_path}](#{anchor})\n")
+        f.write(f"## Table of Contents\n\n{''.join(entries)}\n---\n\n")
+
+    def _code_block_delimiters(self, language: str, file_path: Path) -> Tuple[str, str]:
+        """Get the text written before and after a file's content"""
+        rel_path = self._get_rel_posix_path(file_path)
+        if self.use_xml:
+            return f'<file path="{rel_path}" language="{language}">\n', "</file>"
+
+        return f"```{language}\n# File: {rel_path}\n", "```"
+
+    def _transforms_content(self) -> bool:
+        """Whether _format_code_block rewrites content (subclasses that do must return True)
+
+        When False, file bytes that are already UTF-8 with LF newlines are copied into the output
+        as-is, skipping the decode/encode round-trip.
+        """
+        return False
 
     def _format_code_block(self, content: str, language: str, file_path: Path) -> str:
         """Format the code block (hook for subclasses to override)"""
         if not content.endswith("\n"):
             content += "\n"
 
-        rel_path = self._get_rel_path_with_root(file_path).as_posix()
-        if self.use_xml:
-            return f'<file path="{rel_path}" language="{language}">\n{content}</file>'
-
-        return f"```{language}\n# File: {rel_path}\n{content}```"
+        opening, closing = self._code_block_delimiters(language, file_path)
+        return f"{opening}{content}{closing}"
 
-    def _write_file_section(self, f, file_path: Path):
-        """Write a single file's content and metadata"""
+    def _write_file_section(
+        self,
+        f,
+        file_path: Path,
+        file_data: Optional[Tuple[bytes, int, float]] = None,
+        anchor: Optional[str] = None,
+    ):
+        """Write a single file's content and metadata (f is a text wrapper over a binary buffer)"""
         rel_path = self._get_rel_path_with_root(file_path)
-        content = self._read_file_content(file_path)
+        if file_data is not None:
+            content, size, mtime = file_data
+        else:
+            content = None
+            size, mtime = self._get_file_stat(file_path)
         language = self._get_language_from_extension(file_path)
-        anchor = (
-            rel_path.as_posix()
-            .replace("/", "-")
-            .replace(".", "-")
-            .replace("_", "-")
-            .lower()
+        if anchor is None:
+            anchor = self._get_anchor(file_path)
+
+        # Each piece of text is written with one call; every write goes through the UTF-8 encoder
+        metadata = (
+            f"## {rel_path} {{#{anchor}}}\n\n"
+            f"**File Path:** `{rel_path}`  \n"
+            f"**File Size:** {size} bytes  \n"
+            f"**Language:** {language}  \n"
+            f"**Last Modified:** {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime))}\n\n"
         )
 
-        f.write(f"## {rel_path} {{#{anchor}}}\n\n")
-        f.write(f"**File Path:** `{rel_path}`  \n")
-        f.write(f"**File Size:** {self._get_file_size(file_path)} bytes  \n")
-        f.write(f"**Language:** {language}  \n")
-        f.write(
-            f"**Last Modified:** {datetime.fromtimestamp(file_path.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-        )
+        if self._transforms_content():
+            if content is None:
+                content = self._read_file_bytes(file_path)
+            code_block = self._format_code_block(self._decode_content(content), language, file_path)
+            f.write(f"{metadata}{code_block}\n\n---\n\n")
+        else:
+            opening, closing = self._code_block_delimiters(language, file_path)
+            f.write(metadata + opening)
+            if content is None:
+                ends_with_newline = self._copy_file_into(f.buffer, file_path)
+            else:
+                content = self._as_output_bytes(content)
+                f.buffer.write(content)
+                ends_with_newline = content.endswith(b"\n")
+            if not ends_with_newline:
+                closing = "\n" + closing
+            f.write(f"{closing}\n\n---\n\n")
+
+    def _as_output_bytes(self, raw: bytes) -> bytes:
+        """Get raw content as written to a part: valid UTF-8 with normalized newlines
+
+        Content that already is so is written as-is; anything else goes through _decode_content.
+        """
+        if b"\r" not in raw:
+            try:
+                raw.decode("utf-8")
+                return raw
+            except UnicodeDecodeError:
+                pass
+        return self._decode_content(raw).encode("utf-8")
+
+    def _copy_file_into(self, out, file_path: Path) -> bool:
+        """Copy a file's content into the binary stream out; return whether it ends with a newline
+
+        Chunks that are valid UTF-8 without carriage returns are copied as they are. From the first
+        chunk that isn't, the rest of the file goes through _decode_content, so the part stays valid
+        UTF-8 with normalized newlines either way.
+        """
+        # Every byte has to be checked before it lands in the part, and the check already brings
+        # the chunk into memory, so a kernel-side copy (sendfile) would only read it a second time
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = b""  # the start of a multibyte character cut off at a chunk boundary
+        last = b""
+        try:
+            with open(file_path, "rb") as src:
+                while True:
+                    chunk = src.read(_COPY_CHUNK)
+                    if not chunk:
+                        break
+                    data = pending + chunk
+                    try:
+                        if b"\r" in data:
+                            raise ValueError
+                        decoder.decode(chunk)
+                    except ValueError:  # UnicodeDecodeError is a ValueError too
+                        text = self._decode_content(data + src.read())
+                        if text:
+                            out.write(text.encode("utf-8"))
+                            return text.endswith("\n")
+                        return last == b"\n"
+
+                    pending = decoder.getstate()[0]
+                    data = data[: len(data) - len(pending)]
+                    if data:
+                        out.write(data)
+                        last = data[-1:]
+                # A character still cut off at the end of the file is dropped, as decoding ignores it
+                return last == b"\n"
+        except OSError as e:
+            out.write(f"Error reading file: {e}".encode("utf-8"))
+            return False
 
-        formatted_code = self._format_code_block(content, language, file_path)
-        f.write(f"{formatted_code}\n\n---\n\n")
+    def _write_buffer(self, output_file: Path, data: bytes):
+        """Write an in-memory document to disk in one call"""
+        with open(output_file, "wb") as out:
+            out.write(data)
 
     def _write_part_file(
         self,
@@ -711,28 +1309,49 @@ class CodebaseConsolidator:
         part_num: int,
         total_parts: int,
         all_files: List[Path],
-    ):
+        file_data: Optional[Dict[Path, Tuple[bytes, int, float]]] = None,
+    ) -> Path:
         """Orchestrate writing a single part file"""
         output_file = output_path / f"codebase_part_{part_num:03d}.md"
-
-        with open(output_file, "w", encoding="utf-8") as f:
+        file_data = file_data or {}
+        # The TOC and the section headings share the same anchors; compute each once
+        anchors = {file_path: self._get_anchor(file_path) for file_path in bucket}
+
+        # Text goes through the wrapper straight into the buffered part file; when content is
+        # copied verbatim, _copy_file_into writes its bytes to the buffer in between without decoding
+        with io.TextIOWrapper(
+            open(output_file, "wb", buffering=_COPY_CHUNK), encoding="utf-8", newline="\n", write_through=True
+        ) as f:
             self._write_part_header(f, part_num, total_parts, len(bucket), all_files)
-            self._write_toc(f, bucket)
+            self._write_toc(f, bucket, anchors)
 
             for file_path in bucket:
-                self._write_file_section(f, file_path)
+                self._write_file_section(f, file_path, file_data.get(file_path), anchors[file_path])
 
-        print(f"   Created: codebase_part_{part_num:03d}.md ({len(bucket)} files)")
+        return output_file
+
+    def _write_bucket(
+        self,
+        output_path: Path,
+        bucket: List[Path],
+        part_num: int,
+        total_parts: int,
+        all_files: List[Path],
+        read_ahead: Optional[_ReadAhead] = None,
+    ) -> Path:
+        """Wait for this part's pending reads, if any, then write the part file"""
+        file_data = read_ahead.fetch(part_num - 1) if read_ahead else {}
+        return self._write_part_file(output_path, bucket, part_num, total_parts, all_files, file_data)
 
     def _create_index(self, output_path: Path, files: List[Path], file_buckets: List[List[Path]], actual_files: int):
         """Generate the README.md index file"""
         index_file = output_path / "README.md"
-        with open(index_file, "w", encoding="utf-8") as f:
+        with io.StringIO() as f:
             f.write("# 📚 Consolidated Codebase\n\n")
             f.write("**Source Directories:**  \n")
             for p in self.root_paths:
-                f.write(f"- `{p.absolute()}`  \n")
-            f.write(f"\n**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  \n")
+                f.write(f"- `{p}`  \n")
+            f.write(f"\n**Generated:** {self._get_generated_at()}  \n")
             f.write(f"**Total Files Processed:** {len(files)}  \n")
             f.write(f"**Target Output Files:** {self.target_files}  \n")
             f.write(f"**Actual Output Files:** {actual_files}  \n\n")
@@ -755,16 +1374,20 @@ class CodebaseConsolidator:
             f.write(f"This consolidated codebase was generated using the Codebase Consolidator tool.\n")
             f.write(f"Each markdown file contains multiple source files with syntax highlighting and metadata.\n\n")
             f.write(f"**Command used:**\n```bash\n")
-            paths_str = " ".join([str(p.absolute()) for p in self.root_paths])
+            paths_str = " ".join([str(p) for p in self.root_paths])
             f.write(f"codebase-consolidator {paths_str} -n {self.target_files}\n```\n")
 
+            self._write_buffer(index_file, f.getvalue().encode("utf-8"))
+
         return index_file
 
     def consolidate(self, output_base_dir: str = None, custom_folder_name: str = None):
         """Main method to consolidate the codebase"""
         print(f"Scanning {len(self.root_paths)} codebases...")
         for root in self.root_paths:
-            print(f" - {root.absolute()}")
+            print(f" - {root}")
+
+        self._generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Collect files
         files = self._collect_files()
@@ -784,9 +1407,25 @@ class CodebaseConsolidator:
 
         print(f"Creating {actual_files} consolidated markdown files...")
 
-        # Generate consolidated files
-        for i, bucket in enumerate(file_buckets):
-            self._write_part_file(output_path, bucket, i + 1, actual_files, files)
+        # Generate consolidated files. Sources are read by one pool, in part order and a few parts
+        # ahead, and each part is written by another pool as soon as its own files are in, so slow
+        # reads and writes overlap.
+        with ThreadPoolExecutor(max_workers=_IO_WORKERS) as readers, ThreadPoolExecutor(
+            max_workers=min(_IO_WORKERS, actual_files)
+        ) as writers:
+            # Content that is copied verbatim is streamed by the part writers; only prefetch
+            # files whose content has to be decoded and transformed
+            read_ahead = (
+                _ReadAhead(readers, self._read_file_data, file_buckets) if self._transforms_content() else None
+            )
+            futures = {
+                writers.submit(self._write_bucket, output_path, bucket, i + 1, actual_files, files, read_ahead): bucket
+                for i, bucket in enumerate(file_buckets)
+            }
+            # Parts finish in any order; report them in part order
+            for future, bucket in futures.items():
+                output_file = future.result()
+                print(f"   Created: {output_file.name} ({len(bucket)} files)")
 
         # Create index file
         index_file = self._create_index(output_path, files, file_buckets, actual_files)
@@ -800,6 +1439,9 @@ class CodebaseConsolidator:
 
 
 def main():
+    # Only the command line needs argparse; importing the module as a library (the GUI) skips it
+    import argparse
+
     parser = argparse.ArgumentParser(
         prog="codebase-consolidator",
         description="Consolidate your entire codebase into organized markdown files",
@@ -810,6 +1452,7 @@ Examples:
   %(prog)s /path/to/my-project -n 300             # Consolidate into 300 files
   %(prog)s ~/code/my-app -o ~/Desktop             # Output to Desktop
   %(prog)s . --folder-name my-analysis           # Custom folder name
+  %(prog)s . -n 40 --contiguous                  # Keep neighbouring files together
 
 The tool will create a timestamped folder with descriptive naming like:
   my-project_consolidated_50files_20240925_143022/
@@ -850,6 +1493,11 @@ The tool will create a timestamped folder with descriptive naming like:
         action="store_true",
         help="Use XML tags <file path='...'> instead of markdown code blocks (better for RAG)",
     )
+    parser.add_argument(
+        "--contiguous",
+        action="store_true",
+        help="Fill parts with consecutive files in path order instead of balancing sizes across parts",
+    )
     parser.add_argument(
         "--no-tree",
         action="store_true",
@@ -905,6 +1553,7 @@ The tool will create a timestamped folder with descriptive naming like:
             use_xml=args.xml,
             include_tree=not args.no_tree,
             max_part_size=args.max_size,
+            contiguous=args.contiguous,
         )
         result_path = consolidator.consolidate(output_dir, args.folder_name)
 
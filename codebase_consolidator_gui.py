@@ -14,14 +14,15 @@ interface to:
 
 from __future__ import annotations
 
+import contextlib
+import io
 import os
 import queue
 import subprocess
 import sys
 import threading
-from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Callable, List, NamedTuple, Optional, Tuple
 
 import ttkbootstrap as tb
 from ttkbootstrap.dialogs import Messagebox
@@ -47,6 +48,27 @@ from tkinter import ttk
 
 from codebase_consolidator import CodebaseConsolidator
 
+# Once the log holds more than LOG_MAX_LINES lines, trim it back to the newest LOG_KEEP_LINES
+LOG_MAX_LINES = 5000
+LOG_KEEP_LINES = 4000
+# Previews with more files than this open only the root directories and insert the
+# rows of deeper directories when those are opened
+PREVIEW_EXPAND_LIMIT = 1000
+# Files handed from the preview worker to the UI thread per batch
+PREVIEW_BATCH_SIZE = 1000
+# Delay between queued log text and the drain, so a burst of lines lands in one insert
+LOG_DRAIN_DELAY_MS = 50
+
+
+def _format_size(file_size: int) -> str:
+    """Format a file size for the preview's Size column"""
+    if file_size < 1024:
+        return f"{file_size} B"
+    elif file_size < 1024 * 1024:
+        return f"{file_size / 1024:.1f} KB"
+    else:
+        return f"{file_size / (1024 * 1024):.1f} MB"
+
 
 class EnhancedCodebaseConsolidator(CodebaseConsolidator):
     """Extended consolidator with GUI formatting options."""
@@ -70,58 +92,63 @@ class EnhancedCodebaseConsolidator(CodebaseConsolidator):
         )
         self.syntax_theme = syntax_theme
         self.line_numbers = line_numbers
+        # Formatting summary appended to every part header; the options are fixed for the run
+        self._header_footer = (
+            f"**Syntax Theme:** {syntax_theme}  \n"
+            f"**Line Numbers:** {'Enabled' if line_numbers else 'Disabled'}  \n"
+            f"**Format:** {'XML Tags' if use_xml else 'Markdown Code Blocks'}  \n\n"
+        )
+        # Line numbers are skipped with XML (RAG optimization), see _transforms_content
+        self._effective_line_numbers = line_numbers and not use_xml
+        # Theme comment put before each markdown code block (none for the default theme)
+        self._theme_prefix = (
+            "" if syntax_theme == "github" or use_xml else f"<!-- Syntax theme: {syntax_theme} -->\n"
+        )
 
     def _write_part_header(self, f, part_num: int, total_parts: int, file_count: int, all_files: List[Path] = None):
         """Override to add GUI-specific metadata to the header"""
         super()._write_part_header(f, part_num, total_parts, file_count, all_files)
-        f.write(f"**Syntax Theme:** {self.syntax_theme}  \n")
-        f.write(
-            f"**Line Numbers:** {'Enabled' if self.line_numbers else 'Disabled'}  \n"
-        )
-        f.write(f"**Format:** {'XML Tags' if self.use_xml else 'Markdown Code Blocks'}  \n\n")
+        f.write(self._header_footer)
 
-    def _format_code_block(self, content: str, language: str, file_path: Path) -> str:
-        """Format code block with optional line numbers and syntax theme info."""
-        # For RAG optimization: skip line numbers if using XML
-        effective_line_numbers = self.line_numbers and not self.use_xml
+    def _transforms_content(self) -> bool:
+        """Line numbers rewrite the content; for RAG optimization they are skipped when using XML"""
+        return self._effective_line_numbers
 
-        # Add syntax theme as a comment if it's not the default (only for markdown)
-        theme_comment = ""
-        if self.syntax_theme != "github" and not self.use_xml:
-            theme_comment = f"<!-- Syntax theme: {self.syntax_theme} -->\n"
+    def _code_block_delimiters(self, language: str, file_path: Path) -> Tuple[str, str]:
+        """Add syntax theme as a comment if it's not the default (only for markdown)"""
+        opening, closing = super()._code_block_delimiters(language, file_path)
+        if self._theme_prefix:
+            opening = self._theme_prefix + opening
+        return opening, closing
 
-        # Add line numbers if enabled
-        if effective_line_numbers:
+    def _format_code_block(self, content: str, language: str, file_path: Path) -> str:
+        """Format code block with optional line numbers."""
+        if self._effective_line_numbers:
+            # split("\n") rather than splitlines(): the latter also breaks on form feeds,
+            # vertical tabs and Unicode separators, which would change the numbering
             lines = content.split("\n")
             # Handle case where split produces an empty string at the end if content ends with newline
             if lines and not lines[-1]:
                 lines.pop()
 
-            numbered_lines = []
-            for i, line in enumerate(lines, 1):
-                numbered_lines.append(f"{i:4d} | {line}")
-            content = "\n".join(numbered_lines)
+            # %-formatting (index, line) tuples through map keeps the per-line work in C
+            content = "\n".join(map("%4d | %s".__mod__, enumerate(lines, 1)))
 
             # Re-add newline if it was there (to match original behavior mostly)
             content += "\n"
 
-        rel_path = self._get_rel_path_with_root(file_path).as_posix()
-        if self.use_xml:
-            return f'<file path="{rel_path}" language="{language}">\n{content}</file>'
-
-        return f"{theme_comment}```{language}\n# File: {rel_path}\n{content}```"
+        return super()._format_code_block(content, language, file_path)
 
     def _create_index(self, output_path: Path, files: List[Path], file_buckets: List[List[Path]], actual_files: int):
         """Override to add formatting options to the index file"""
         index_file = output_path / "README.md"
-        with open(index_file, "w", encoding="utf-8") as f:
+        # Built in memory and written with one call, like the base index
+        with io.StringIO() as f:
             f.write("# 📚 Consolidated Codebase\n\n")
             f.write("**Source Directories:**  \n")
             for p in self.root_paths:
-                f.write(f"- `{p.absolute()}`  \n")
-            f.write(
-                f"\n**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  \n"
-            )
+                f.write(f"- `{p}`  \n")
+            f.write(f"\n**Generated:** {self._get_generated_at()}  \n")
             f.write(f"**Total Files Processed:** {len(files)}  \n")
             f.write(f"**Target Output Files:** {self.target_files}  \n")
             f.write(f"**Actual Output Files:** {actual_files}  \n")
@@ -173,22 +200,73 @@ class EnhancedCodebaseConsolidator(CodebaseConsolidator):
                 "- **Metadata** for each file including size and modification date\n\n"
             )
 
+            self._write_buffer(index_file, f.getvalue().encode("utf-8"))
+
         return index_file
 
 
+class RunConfig(NamedTuple):
+    """Form values for one run, read on the UI thread so the worker never touches Tk variables"""
+
+    codebase_paths: List[str]
+    n_files: int
+    output_dir: Optional[str]
+    folder_name: Optional[str]
+    verbose: bool
+    syntax_theme: str
+    line_numbers: bool
+    use_xml: bool
+    include_tree: bool
+    max_size: int
+
+
 class QueueWriter:
-    """A file-like object that writes to a Queue for GUI consumption."""
+    """A file-like object that writes to a Queue for GUI consumption.
+
+    Writes are buffered and handed to the queue as whole lines (or once the buffer
+    reaches ``threshold`` characters), so ``print`` fragments don't each become a
+    separate log insert.
+    """
 
-    def __init__(self, q: queue.Queue[str]):
+    def __init__(
+        self,
+        q: queue.Queue[str],
+        threshold: int = 4096,
+        notify: Optional[Callable[[], None]] = None,
+    ):
         self.q = q
+        self.threshold = threshold
+        self.notify = notify
+        self._buf: List[str] = []
+        self._size = 0
+        self._lock = threading.Lock()
 
     def write(self, s: str) -> int:
         if s:
-            self.q.put(s)
+            with self._lock:
+                self._buf.append(s)
+                self._size += len(s)
+                text = self._take_locked() if "\n" in s or self._size >= self.threshold else ""
+            self._hand_over(text)
         return len(s)
 
-    def flush(self) -> None:  # for compatibility
-        pass
+    def flush(self) -> None:
+        with self._lock:
+            text = self._take_locked()
+        self._hand_over(text)
+
+    def _take_locked(self) -> str:
+        text = "".join(self._buf)
+        self._buf.clear()
+        self._size = 0
+        return text
+
+    def _hand_over(self, text: str) -> None:
+        # Called without the lock held, so a slow notify can't block writers on other threads
+        if text:
+            self.q.put(text)
+            if self.notify is not None:
+                self.notify()
 
 
 class ConsolidatorGUI(tb.Window):
@@ -201,11 +279,14 @@ class ConsolidatorGUI(tb.Window):
         self._worker: Optional[threading.Thread] = None
         self._stop_flag = threading.Event()
         self._log_queue: queue.Queue[str] = queue.Queue()
-        self._stdout_backup = sys.stdout
-        self._stderr_backup = sys.stderr
         self._last_output_path: Optional[Path] = None
         self._tree_item_paths: dict[str, Path] = {}
         self._preview_worker: Optional[threading.Thread] = None
+        self._log_lines = 0
+        self._preview_root: list = ["", {}, True]
+        self._preview_pending: dict[str, list] = {}
+        self._preview_expand_dirs = True
+        self._log_drain_pending = threading.Event()
         # build UI
         self._build_header()
         self._build_form()
@@ -213,9 +294,6 @@ class ConsolidatorGUI(tb.Window):
         self._build_main_content()
         self._build_actions()
 
-        # start polling log queue
-        self.after(100, self._drain_log_queue)
-
     def _build_header(self) -> None:
         header = tb.Frame(self, padding=(15, 10))
         header.pack(fill=X)
@@ -461,6 +539,7 @@ class ConsolidatorGUI(tb.Window):
         tree_scroll_x = tb.Scrollbar(
             tree_frame, orient="horizontal", command=self.file_tree.xview
         )
+        self._tree_scrollbars = (tree_scroll_y, tree_scroll_x)
         self.file_tree.configure(
             yscrollcommand=tree_scroll_y.set, xscrollcommand=tree_scroll_x.set
         )
@@ -470,6 +549,7 @@ class ConsolidatorGUI(tb.Window):
         tree_scroll_x.pack(side=BOTTOM, fill=X)
         self.file_tree.pack(side=LEFT, fill=BOTH, expand=YES)
         self.file_tree.bind("<Double-1>", self._on_tree_item_double_click)
+        self.file_tree.bind("<<TreeviewOpen>>", self._on_tree_item_open)
 
         # Log tab
         self.log_frame = tb.Frame(self.notebook)
@@ -572,92 +652,114 @@ class ConsolidatorGUI(tb.Window):
         try:
             consolidator = CodebaseConsolidator(paths, 1)
             files = consolidator._collect_files()
-            file_data: List[Tuple[Path, int, str]] = []
-            for file_path in files:
-                size = consolidator._get_file_size(file_path)
-                language = consolidator._get_language_from_extension(file_path)
-                file_data.append((file_path, size, language))
+
+            # Hand the files over in batches so the tree fills in while the rest is prepared
+            self.after(0, lambda: self._begin_preview_tree(len(files)))
+            for start in range(0, len(files), PREVIEW_BATCH_SIZE):
+                batch: List[Tuple[Path, Tuple[str, ...], str, str]] = []
+                for file_path in files[start : start + PREVIEW_BATCH_SIZE]:
+                    # Display parts start with the root's name, so different roots stay apart
+                    parts = consolidator._get_rel_path_with_root(file_path).parts
+                    size_str = _format_size(consolidator._get_file_size(file_path))
+                    language = consolidator._get_language_from_extension(file_path)
+                    batch.append((file_path, parts, size_str, language))
+                self.after(0, lambda b=batch: self._populate_preview_tree(b))
         except Exception as e:
             self.after(0, lambda err=e: self._handle_preview_error(err))
             return
-
-        self.after(
-            0,
-            lambda: self._populate_preview_tree(paths, file_data),
-        )
+        self.after(0, lambda: self._finish_preview_tree(len(files)))
 
     def _handle_preview_error(self, error: Exception):
+        # The tree may have been partly filled with its scrollbars unhooked; hook them back up
+        tree_scroll_y, tree_scroll_x = self._tree_scrollbars
+        self.file_tree.configure(
+            yscrollcommand=tree_scroll_y.set, xscrollcommand=tree_scroll_x.set
+        )
         Messagebox.show_error(f"Error scanning directory:\n{error}", "Preview Error")
         self.refresh_btn.configure(state=NORMAL)
         self.file_count_label.configure(text="Preview unavailable")
         self._preview_worker = None
 
-    def _populate_preview_tree(
-        self, paths: List[str], file_data: List[Tuple[Path, int, str]]
-    ):
+    def _begin_preview_tree(self, file_count: int):
+        # Unhook the scrollbars while filling the tree so they aren't recomputed per insert
+        self.file_tree.configure(yscrollcommand="", xscrollcommand="")
+
         # Clear existing tree
-        for item in self.file_tree.get_children():
-            self.file_tree.delete(item)
+        self.file_tree.delete(*self.file_tree.get_children())
         self._tree_item_paths.clear()
 
-        root_paths = [Path(p).resolve() for p in paths]
-        dir_nodes: dict[str, str] = {}
+        # Large previews start collapsed below the roots; a collapsed directory's rows are
+        # only inserted when it is first opened, so Tk only holds the rows that can be seen
+        self._preview_expand_dirs = file_count <= PREVIEW_EXPAND_LIMIT
 
-        for file_path, file_size, file_type in file_data:
-            # Find which root this file belongs to
-            target_root = None
-            for root in root_paths:
-                try:
-                    rel_path = file_path.relative_to(root)
-                    target_root = root
-                    break
-                except ValueError:
-                    continue
+        # Directory nodes as a trie of [item id, children, expanded], where children maps
+        # names to sub-directory nodes or (path, size, type) file entries in insertion order
+        self._preview_root = ["", {}, True]
+        # Item id -> node of each collapsed directory whose children are not inserted yet
+        self._preview_pending = {}
 
-            if not target_root:
-                continue
+    def _populate_preview_tree(self, file_data: List[Tuple[Path, Tuple[str, ...], str, str]]):
+        root = self._preview_root
+        expand_dirs = self._preview_expand_dirs
 
-            # Prefix with root name
-            prefixed_rel_path = Path(target_root.name) / rel_path
-            parts = prefixed_rel_path.parts
+        for file_path, parts, size_str, file_type in file_data:
+            node = root
+            for part in parts[:-1]:
+                child = node[1].get(part)
+                if child is None:
+                    # The roots themselves always start open
+                    child = node[1][part] = [None, {}, expand_dirs or node is root]
+                    if node[2]:
+                        self._insert_preview_dir(node[0], part, child)
+                node = child
+
+            entry = node[1][parts[-1]] = (file_path, size_str, file_type)
+            if node[2]:
+                self._insert_preview_file(node[0], parts[-1], entry)
+
+    def _insert_preview_dir(self, parent_id: str, name: str, node: list):
+        node[0] = self.file_tree.insert(
+            parent_id,
+            "end",
+            text=f"📁 {name}",
+            values=("", "Directory"),
+            open=node[2],
+        )
+        if not node[2]:
+            # Placeholder row so the directory shows an expand arrow; replaced on first open
+            self.file_tree.insert(node[0], "end")
+            self._preview_pending[node[0]] = node
+
+    def _insert_preview_file(self, parent_id: str, name: str, entry: Tuple[Path, str, str]):
+        file_path, size_str, file_type = entry
+        item_id = self.file_tree.insert(
+            parent_id,
+            "end",
+            text=f"📄 {name}",
+            values=(size_str, file_type),
+        )
+        self._tree_item_paths[item_id] = file_path
 
-            # Create directory nodes if they don't exist
-            current_path = ""
-            parent = ""
+    def _on_tree_item_open(self, event):
+        node = self._preview_pending.pop(self.file_tree.focus(), None)
+        if node is None:
+            return
 
-            for part in parts[:-1]:
-                current_path = str(Path(current_path) / part) if current_path else part
-
-                if current_path not in dir_nodes:
-                    node_id = self.file_tree.insert(
-                        parent,
-                        "end",
-                        text=f"📁 {part}",
-                        values=("", "Directory"),
-                        open=True,
-                    )
-                    dir_nodes[current_path] = node_id
-                    # This path mapping might be slightly broken for virtual root names
-                    # but double-click on file still works fine since it uses file_path
-                parent = dir_nodes[current_path]
-
-            # Format file size string
-            if file_size < 1024:
-                size_str = f"{file_size} B"
-            elif file_size < 1024 * 1024:
-                size_str = f"{file_size / 1024:.1f} KB"
+        item_id = node[0]
+        self.file_tree.delete(*self.file_tree.get_children(item_id))
+        node[2] = True
+        for name, child in node[1].items():
+            if isinstance(child, list):
+                self._insert_preview_dir(item_id, name, child)
             else:
-                size_str = f"{file_size / (1024 * 1024):.1f} MB"
+                self._insert_preview_file(item_id, name, child)
 
-            item_id = self.file_tree.insert(
-                parent,
-                "end",
-                text=f"📄 {parts[-1]}",
-                values=(size_str, file_type),
-            )
-            self._tree_item_paths[item_id] = file_path
+    def _finish_preview_tree(self, file_count: int):
+        tree_scroll_y, tree_scroll_x = self._tree_scrollbars
+        self.file_tree.configure(
+            yscrollcommand=tree_scroll_y.set, xscrollcommand=tree_scroll_x.set
+        )
 
-        file_count = len(file_data)
         self.file_count_label.configure(
             text=f"Found {file_count} file{'s' if file_count != 1 else ''} to process"
         )
@@ -737,29 +839,25 @@ class ConsolidatorGUI(tb.Window):
         self.stop_btn.configure(state=NORMAL)
         self.prog.start(10)
 
-        # Get formatting options
-        syntax_theme = self.syntax_theme_var.get()
-        line_numbers = self.line_numbers_var.get()
-        use_xml = self.xml_var.get()
-        include_tree = self.tree_var.get()
+        # Snapshot the formatting options along with the rest of the form
+        config = RunConfig(
+            codebase_paths=validated_paths,
+            n_files=n_files,
+            output_dir=output_dir,
+            folder_name=folder_name,
+            verbose=self.verbose_var.get(),
+            syntax_theme=self.syntax_theme_var.get(),
+            line_numbers=self.line_numbers_var.get(),
+            use_xml=self.xml_var.get(),
+            include_tree=self.tree_var.get(),
+            max_size=max_size,
+        )
 
         # Switch to log tab
         self.notebook.select(self.log_frame)
 
         # Start worker thread
-        args = (
-            validated_paths,
-            n_files,
-            output_dir,
-            folder_name,
-            self.verbose_var.get(),
-            syntax_theme,
-            line_numbers,
-            use_xml,
-            include_tree,
-            max_size,
-        )
-        self._worker = threading.Thread(target=self._run_worker, args=args, daemon=True)
+        self._worker = threading.Thread(target=self._run_worker, args=(config,), daemon=True)
         self._worker.start()
 
     def _on_stop(self):
@@ -784,44 +882,39 @@ class ConsolidatorGUI(tb.Window):
             Messagebox.show_error(f"Could not open folder:\n{e}", "Open Error")
 
     # Worker logic
-    def _run_worker(
-        self,
-        codebase_paths: List[str],
-        n_files: int,
-        output_dir: Optional[str],
-        folder_name: Optional[str],
-        verbose: bool,
-        syntax_theme: str,
-        line_numbers: bool,
-        use_xml: bool,
-        include_tree: bool,
-        max_size: int,
-    ):
+    def _run_worker(self, config: RunConfig):
         # Redirect stdout/stderr to GUI queue
-        qwriter = QueueWriter(self._log_queue)
-        sys.stdout = qwriter
-        sys.stderr = qwriter
+        qwriter = QueueWriter(self._log_queue, notify=self._schedule_log_drain)
+        try:
+            with contextlib.redirect_stdout(qwriter), contextlib.redirect_stderr(qwriter):
+                self._consolidate_logged(config)
+        finally:
+            # stdout/stderr are restored by now; hand over anything still buffered
+            qwriter.flush()
+            self.after(0, self._on_worker_done)
 
+    def _consolidate_logged(self, config: RunConfig):
+        """Run the consolidation, reporting progress and errors through print"""
         try:
             print("🚀 Codebase Consolidator GUI")
             print("=" * 50)
-            print(f"📁 Source paths: {len(codebase_paths)}")
-            print(f"🎨 Using syntax theme: {syntax_theme}")
-            print(f"🔢 Line numbers: {'enabled' if line_numbers else 'disabled'}")
-            print(f"🏷️ XML Output: {'enabled' if use_xml else 'disabled'}")
-            print(f"🌳 File Tree: {'enabled' if include_tree else 'disabled'}")
-            print(f"📏 Max Part Size: {max_size / 1024:.1f} KB")
+            print(f"📁 Source paths: {len(config.codebase_paths)}")
+            print(f"🎨 Using syntax theme: {config.syntax_theme}")
+            print(f"🔢 Line numbers: {'enabled' if config.line_numbers else 'disabled'}")
+            print(f"🏷️ XML Output: {'enabled' if config.use_xml else 'disabled'}")
+            print(f"🌳 File Tree: {'enabled' if config.include_tree else 'disabled'}")
+            print(f"📏 Max Part Size: {config.max_size / 1024:.1f} KB")
 
             consolidator = EnhancedCodebaseConsolidator(
-                codebase_paths,
-                n_files,
-                syntax_theme,
-                line_numbers,
-                use_xml=use_xml,
-                include_tree=include_tree,
-                max_part_size=max_size,
+                config.codebase_paths,
+                config.n_files,
+                config.syntax_theme,
+                config.line_numbers,
+                use_xml=config.use_xml,
+                include_tree=config.include_tree,
+                max_part_size=config.max_size,
             )
-            result = consolidator.consolidate(output_dir, folder_name)
+            result = consolidator.consolidate(config.output_dir, config.folder_name)
 
             self._last_output_path = Path(result) if result else None
 
@@ -829,15 +922,10 @@ class ConsolidatorGUI(tb.Window):
             print("\n❌ Operation cancelled by user")
         except Exception as e:
             print(f"❌ Error: {e}")
-            if verbose:
+            if config.verbose:
                 import traceback
 
                 traceback.print_exc()
-        finally:
-            # Restore stdout/stderr
-            sys.stdout = self._stdout_backup
-            sys.stderr = self._stderr_backup
-            self.after(0, self._on_worker_done)
 
     def _on_worker_done(self):
         self.prog.stop()
@@ -849,16 +937,33 @@ class ConsolidatorGUI(tb.Window):
     # Logging helpers
     def _append_log(self, text: str) -> None:
         self.log.insert(END, text)
+        self._log_lines += text.count("\n")
+        if self._log_lines > LOG_MAX_LINES:
+            # Drop the oldest lines in one call so redraws stay bounded on long runs
+            excess = self._log_lines - LOG_KEEP_LINES
+            self.log.delete("1.0", f"{excess + 1}.0")
+            self._log_lines -= excess
         self.log.see(END)
 
+    def _schedule_log_drain(self) -> None:
+        """Called from the worker after it queues log text; posts one drain per burst, no polling"""
+        # QueueWriter calls this with its lock released, so the after() call never holds up writers
+        if not self._log_drain_pending.is_set():
+            self._log_drain_pending.set()
+            self.after(LOG_DRAIN_DELAY_MS, self._drain_log_queue)
+
     def _drain_log_queue(self):
+        # Clear the flag before draining so text queued from here on schedules another drain.
+        # Insert everything queued since the drain was scheduled at once: one insert and one scroll.
+        self._log_drain_pending.clear()
+        chunks = []
         try:
             while True:
-                chunk = self._log_queue.get_nowait()
-                self._append_log(chunk)
+                chunks.append(self._log_queue.get_nowait())
         except queue.Empty:
             pass
-        self.after(100, self._drain_log_queue)
+        if chunks:
+            self._append_log("".join(chunks))
 
 
 def main():
@@ -3,7 +3,7 @@ import tempfile
 import shutil
 import os
 from pathlib import Path
-from codebase_consolidator import CodebaseConsolidator
+from codebase_consolidator import CodebaseConsolidator, _FILE_OVERHEAD_BYTES
 
 class TestCodebaseConsolidator(unittest.TestCase):
     def setUp(self):
@@ -32,6 +32,64 @@ class TestCodebaseConsolidator(unittest.TestCase):
         self.assertTrue("*.log" in consolidator.ignored_patterns)
         self.assertTrue("temp/" in consolidator.ignored_patterns)
 
+    def test_ignore_rules_categorized(self):
+        """Test that the built-in patterns are precompiled into name, glob and path buckets"""
+        consolidator = CodebaseConsolidator(str(self.root_path))
+        root = consolidator.root_paths[0]
+        rules = consolidator.ignore_rules[root]
+
+        self.assertIn("node_modules", rules.dir_names)
+        self.assertIn("pyc", rules.suffixes)
+        self.assertTrue(rules.name_re.match("cache.tfstate.backup"))
+        self.assertTrue(rules.path_re.match("docs/_build"))
+        self.assertFalse(rules.path_re.match("docs"))
+
+        self.assertTrue(consolidator._is_ignored(root / "src" / "module.pyc", root))
+        self.assertTrue(consolidator._is_ignored(root / "docs" / "_build" / "index.html", root))
+        self.assertFalse(consolidator._is_ignored(root / "docs" / "index.md", root))
+
+    def test_gitignore_semantics(self):
+        """Test negation, anchoring, directory-only and nested .gitignore rules"""
+        with open(self.root_path / ".gitignore", "w") as f:
+            f.write("/top.txt\n")
+            f.write("*.log\n")
+            f.write("!keep.log\n")
+            f.write("out/\n")
+            f.write("src/**/gen_*.py\n")
+
+        for rel in ["top.txt", "src/top.txt", "a.log", "keep.log", "out/x.py", "src/a/gen_x.py", "pkg/a.py", "pkg/b.py"]:
+            path = self.root_path / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+        with open(self.root_path / "pkg" / ".gitignore", "w") as f:
+            f.write("b.py\n")
+
+        consolidator = CodebaseConsolidator(str(self.root_path))
+        root = consolidator.root_paths[0]
+        files = [f.relative_to(root).as_posix() for f in consolidator._collect_files()]
+
+        self.assertEqual(files, [".gitignore", "keep.log", "pkg/.gitignore", "pkg/a.py", "src/top.txt"])
+        self.assertTrue(consolidator._is_ignored(root / "src" / "a" / "gen_x.py", root))
+        self.assertFalse(consolidator._is_ignored(root / "keep.log", root))
+        self.assertTrue(consolidator._is_ignored(root / "pkg" / "b.py", root))
+        self.assertFalse(consolidator._is_ignored(root / "pkg" / "a.py", root))
+
+    def test_gitignore_reincludes_default_ignored_dir(self):
+        """Test that a .gitignore negation re-includes a directory ignored by default"""
+        with open(self.root_path / ".gitignore", "w") as f:
+            f.write("!build/\n")
+
+        for rel in ["build/gen.py", "dist/out.py", "app.py"]:
+            path = self.root_path / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+        consolidator = CodebaseConsolidator(str(self.root_path))
+        root = consolidator.root_paths[0]
+        files = [f.relative_to(root).as_posix() for f in consolidator._collect_files()]
+
+        self.assertEqual(files, [".gitignore", "app.py", "build/gen.py"])
+
     def test_file_collection_ignores(self):
         """Test that files are collected and ignored correctly"""
         # Create some files
@@ -59,6 +117,123 @@ class TestCodebaseConsolidator(unittest.TestCase):
         # temp_file.txt should NOT be found
         self.assertFalse(any(f.name == "temp_file.txt" for f in files))
 
+    def test_ignored_directories_pruned(self):
+        """Test that files below ignored directories are never collected"""
+        (self.root_path / "src").mkdir()
+        (self.root_path / "src" / "app.py").touch()
+
+        nested = self.root_path / "node_modules" / "pkg" / "lib"
+        nested.mkdir(parents=True)
+        (nested / "index.js").touch()
+
+        # Directories ignored by a nested .gitignore and always-pruned directories below the root
+        (self.root_path / "src" / "cache").mkdir()
+        (self.root_path / "src" / "cache" / "data.txt").touch()
+        (self.root_path / "src" / ".git").mkdir()
+        (self.root_path / "src" / ".git" / "HEAD").touch()
+        with open(self.root_path / "src" / ".gitignore", "w") as f:
+            f.write("cache/\n")
+
+        consolidator = CodebaseConsolidator(str(self.root_path))
+        root = consolidator.root_paths[0]
+        files = consolidator._collect_files()
+        self.assertEqual([f.relative_to(root).as_posix() for f in files], ["src/.gitignore", "src/app.py"])
+
+        # _is_ignored agrees with the walk on every file, including those under skipped directories
+        for path in root.rglob("*"):
+            if path.is_file():
+                self.assertEqual(consolidator._is_ignored(path, root), path not in files, path)
+
+    def test_collected_files_in_path_order(self):
+        """Test that collection order matches Path ordering, directories included"""
+        for rel in ["foo.py", "foo/bar.py", "foo-baz.py", "Zed.py", "a/b/c.py"]:
+            path = self.root_path / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+        consolidator = CodebaseConsolidator(str(self.root_path))
+        files = consolidator._collect_files()
+        self.assertEqual(files, sorted(files))
+
+    def test_binary_files_skipped(self):
+        """Test that files with NUL bytes are detected as binary"""
+        with open(self.root_path / "notes", "w") as f:
+            f.write("plain text without an extension\n")
+        with open(self.root_path / "image.dat", "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR")
+
+        with open(self.root_path / "latin1", "wb") as f:
+            f.write("caf\u00e9 au lait\n".encode("latin-1"))
+        with open(self.root_path / "cut_utf8", "wb") as f:
+            f.write(b"x" * 4095 + "\u00e9t\u00e9\n".encode("utf-8"))
+
+        consolidator = CodebaseConsolidator(str(self.root_path))
+        self.assertTrue(consolidator._is_text_file(self.root_path / "notes"))
+        self.assertFalse(consolidator._is_text_file(self.root_path / "image.dat"))
+        self.assertFalse(consolidator._is_text_file(self.root_path / "latin1"))
+        # A multibyte character split by the sniff boundary is not mistaken for invalid UTF-8
+        self.assertTrue(consolidator._is_text_file(self.root_path / "cut_utf8"))
+
+    def test_part_contains_file_content(self):
+        """Test that file content is copied into the part verbatim, fenced on its own lines"""
+        with open(self.root_path / "app.py", "wb") as f:
+            f.write(b"print('hello')")
+
+        consolidator = CodebaseConsolidator(str(self.root_path), target_files=1)
+        files = consolidator._collect_files()
+
+        output_dir = self.root_path / "out"
+        output_dir.mkdir()
+        consolidator._write_part_file(output_dir, files, 1, 1, files)
+
+        content = (output_dir / "codebase_part_001.md").read_text(encoding="utf-8")
+        self.assertIn("/app.py\nprint('hello')\n```\n", content)
+
+    def test_part_is_utf8_with_normalized_newlines(self):
+        """Test that non-UTF-8 and CRLF sources are transcoded rather than copied raw"""
+        with open(self.root_path / "latin1.txt", "wb") as f:
+            f.write("caf\u00e9\n".encode("latin-1"))
+        with open(self.root_path / "crlf.py", "wb") as f:
+            f.write(b"a = 1\r\nb = 2\r\n")
+        with open(self.root_path / "mac.py", "wb") as f:
+            f.write(b"c = 3\rd = 4")
+
+        consolidator = CodebaseConsolidator(str(self.root_path), target_files=1)
+        files = consolidator._collect_files()
+
+        output_dir = self.root_path / "out"
+        output_dir.mkdir()
+        consolidator._write_part_file(output_dir, files, 1, 1, files)
+
+        raw = (output_dir / "codebase_part_001.md").read_bytes()
+        content = raw.decode("utf-8")  # strict
+        self.assertNotIn(b"\r", raw)
+        self.assertIn("/crlf.py\na = 1\nb = 2\n```\n", content)
+        self.assertIn("/mac.py\nc = 3\nd = 4\n```\n", content)
+        self.assertIn("/latin1.txt\ncaf\n```\n", content)
+
+    def test_file_tree_rendering(self):
+        """Test the file tree connectors for nested directories"""
+        for rel in ["src/app.py", "src/lib/util.py", "setup.py"]:
+            path = self.root_path / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+
+        consolidator = CodebaseConsolidator(str(self.root_path))
+        tree = consolidator._generate_file_tree(consolidator._collect_files())
+
+        name = self.root_path.name
+        expected = [
+            ".",
+            f"└── {name}/",
+            "    ├── setup.py",
+            "    └── src/",
+            "        ├── app.py",
+            "        └── lib/",
+            "            └── util.py",
+        ]
+        self.assertEqual(tree.split("\n"), expected)
+
     def test_bucketing_logic(self):
         """Test that files are distributed into buckets correctly"""
         # Create 10 dummy files of equal size (approx)
@@ -81,6 +256,66 @@ class TestCodebaseConsolidator(unittest.TestCase):
         total_files = sum(len(b) for b in buckets)
         self.assertEqual(total_files, 10)
 
+    def test_bucketing_balances_sizes(self):
+        """Test that parts end up with similar total sizes"""
+        for i, size in enumerate([1000, 600, 500, 400, 300, 200]):
+            with open(self.root_path / f"file_{i}.txt", "w") as f:
+                f.write("x" * size)
+
+        consolidator = CodebaseConsolidator(str(self.root_path), target_files=2)
+        files = consolidator._collect_files()
+        buckets = consolidator._distribute_files(files)
+
+        self.assertEqual(len(buckets), 2)
+        totals = [sum(consolidator._get_file_size(f) for f in b) for b in buckets]
+        self.assertLessEqual(max(totals) - min(totals), 200)
+
+        # Files within a part stay in path order
+        for bucket in buckets:
+            self.assertEqual(bucket, sorted(bucket))
+
+    def test_bucketing_contiguous(self):
+        """Test that contiguous parts are runs of path order with the smallest largest part"""
+        for i, size in enumerate([1000, 600, 500, 400, 300, 200]):
+            with open(self.root_path / f"file_{i}.txt", "w") as f:
+                f.write("x" * size)
+
+        consolidator = CodebaseConsolidator(str(self.root_path), target_files=2, contiguous=True)
+        files = consolidator._collect_files()
+        buckets = consolidator._distribute_files(files)
+
+        self.assertEqual([[f.name for f in b] for b in buckets], [
+            ["file_0.txt", "file_1.txt"],
+            ["file_2.txt", "file_3.txt", "file_4.txt", "file_5.txt"],
+        ])
+
+        # Exactly the target number of parts, together covering every file in order
+        consolidator = CodebaseConsolidator(str(self.root_path), target_files=5, contiguous=True)
+        buckets = consolidator._distribute_files(files)
+        self.assertEqual(len(buckets), 5)
+        self.assertEqual(sum(buckets, []), files)
+
+    def test_bucketing_contiguous_close_to_lpt(self):
+        """Test that the contiguous split's largest part stays within one file of LPT's largest part"""
+        for i in range(40):
+            with open(self.root_path / f"file_{i:02d}.txt", "w") as f:
+                f.write("x" * ((i * 7919) % 5000 + 100))
+
+        def largest_part(consolidator, buckets):
+            return max(sum(consolidator._get_file_size(f) + _FILE_OVERHEAD_BYTES for f in b) for b in buckets)
+
+        lpt = CodebaseConsolidator(str(self.root_path), target_files=6)
+        contiguous = CodebaseConsolidator(str(self.root_path), target_files=6, contiguous=True)
+        files = lpt._collect_files()
+        lpt_buckets = lpt._distribute_files(files)
+        contiguous_buckets = contiguous._distribute_files(files)
+
+        self.assertEqual(len(contiguous_buckets), len(lpt_buckets))
+        largest_file = max(lpt._get_file_size(f) + _FILE_OVERHEAD_BYTES for f in files)
+        self.assertLessEqual(
+            largest_part(contiguous, contiguous_buckets), largest_part(lpt, lpt_buckets) + largest_file
+        )
+
     def test_bucketing_more_targets_than_files(self):
         """Test bucketing when target files > source files"""
         # Create 3 files